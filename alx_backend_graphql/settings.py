@@ -130,15 +130,13 @@ GRAPHENE = {
 }
 
 INSTALLED_APPS += [
-        "django_crontab",
-  ]
+    "django_crontab",
+]
 
 CRONJOBS = [
-            ('*/5 * * * *', 'crm.cron.log_crm_heartbeat'),
-            ]
+    ('*/5 * * * *', 'crm.cron.log_crm_heartbeat'),
 ]
 
 CRONJOBS += [
-        ('0 */12 * * *', 'crm.cron.update_low_stock'),
-        ]
-]
\ No newline at end of file
+    ('0 */12 * * *', 'crm.cron.update_low_stock'),
+]
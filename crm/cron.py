@@ -1,49 +1,96 @@
+import atexit
+import logging
+import queue
 from datetime import datetime
-import requests
+from logging.handlers import QueueHandler, QueueListener
+import httpx
+
+
+_HEARTBEAT_LOG = "/tmp/crm_heartbeat_log.txt"
+_LOW_STOCK_LOG = "/tmp/low_stock_updates_log.txt"
+
+_listeners = {}
+
+
+def _file_logger(name, path):
+    """Return a logger whose records are written to ``path`` by a background thread.
+
+    The listener thread is started the first time a job asks for its logger,
+    and the file is only opened when the first record is written.
+    """
+    logger = logging.getLogger(name)
+    if name in _listeners:
+        return logger
+
+    records = queue.Queue(-1)
+    file_handler = logging.FileHandler(path, delay=True)
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+
+    listener = QueueListener(records, file_handler)
+    listener.start()
+    # Flush whatever is still queued before a one-shot cron process exits.
+    atexit.register(listener.stop)
+    _listeners[name] = listener
+
+    logger.addHandler(QueueHandler(records))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+# Built once per process so the heartbeat and the stock update reuse the
+# same keep-alive connection. Queries are sent as plain strings: there is
+# no client-side parsing or validation against a fetched schema.
+_CLIENT = httpx.Client(
+    base_url="http://localhost:8000",
+    transport=httpx.HTTPTransport(retries=3),
+    timeout=5.0,
+)
+
+_HEARTBEAT_QUERY = {"query": "{ hello }"}
+
 
 def log_crm_heartbeat():
     timestamp = datetime.now().strftime("%d/%m/%Y-%H:%M:%S")
 
-        try:
-                requests.post(
-                            "http://localhost:8000/graphql",
-                                        json={"query": "{ hello }"},
-                                                    timeout=5,
-                                                            )
-                                                                    status = "CRM is alive"
-                                                                        except Exception:
-                                                                                status = "CRM unreachable"
-
-                                                                                    with open("/tmp/crm_heartbeat_log.txt", "a") as f:
-                                                                                            f.write(f"{timestamp} {status}\n")
-
-from gql import gql, Client
-from gql.transport.requests import RequestsHTTPTransport
-from datetime import datetime
+    try:
+        _CLIENT.post("/graphql", json=_HEARTBEAT_QUERY)
+        status = "CRM is alive"
+    except Exception:
+        status = "CRM unreachable"
+
+    _file_logger("crm.heartbeat", _HEARTBEAT_LOG).info(f"{timestamp} {status}")
+
+
+_MUTATION = """
+mutation {
+  updateLowStockProducts {
+    products {
+      name
+      stock
+    }
+  }
+}
+"""
+
+
+def _execute(query):
+    response = _CLIENT.post("/graphql", json={"query": query})
+    response.raise_for_status()
+    payload = response.json()
+    if payload.get("errors"):
+        raise RuntimeError("; ".join(e["message"] for e in payload["errors"]))
+    return payload["data"]
+
 
 def update_low_stock():
-    transport = RequestsHTTPTransport(
-            url="http://localhost:8000/graphql",
-                    verify=False,
-                            retries=3,
-                                )
-
-                                    client = Client(transport=transport, fetch_schema_from_transport=True)
-
-                                        mutation = gql("""
-                                            mutation {
-                                                  updateLowStockProducts {
-                                                          products {
-                                                                    name
-                                                                              stock
-                                                                                      }
-                                                                                            }
-                                                                                                }
-                                                                                                    """)
-
-                                                                                                        result = client.execute(mutation)
-
-                                                                                                            with open("/tmp/low_stock_updates_log.txt", "a") as f:
-                                                                                                                    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                                                                                                                            for p in result["updateLowStockProducts"]["products"]:
-                                                                                                                                        f.write(f"{ts} - {p['name']} -> {p['stock']}\n")
\ No newline at end of file
+    result = _execute(_MUTATION)
+
+    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    lines = [
+        f"{ts} - {p['name']} -> {p['stock']}"
+        for p in result["updateLowStockProducts"]["products"]
+    ]
+
+    if lines:
+        _file_logger("crm.low_stock", _LOW_STOCK_LOG).info("\n".join(lines))
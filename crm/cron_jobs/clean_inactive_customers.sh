@@ -11,13 +11,13 @@ cutoff = timezone.now() - timedelta(days=365)
 
 qs = Customer.objects.filter(
     orders__isnull=True,
-        created_at__lt=cutoff
-        )
+    created_at__lt=cutoff
+)
 
-        count = qs.count()
-        qs.delete()
-        print(count)
-        EOF
+count = qs.count()
+qs.delete()
+print(count)
+EOF
 )
 
 echo "$TIMESTAMP - Deleted customers: $DELETED" >> /tmp/customer_cleanup_log.txt
\ No newline at end of file
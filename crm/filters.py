@@ -23,6 +23,10 @@ class ProductFilter(django_filters.FilterSet):
 class OrderFilter(django_filters.FilterSet):
     total_amount = django_filters.RangeFilter()
     order_date = django_filters.DateFromToRangeFilter()
+    # Exposed as orderDate_Gte; compared against the indexed order_date column.
+    order_date__gte = django_filters.IsoDateTimeFilter(
+        field_name="order_date", lookup_expr="gte"
+    )
     customer_name = django_filters.CharFilter(
         field_name="customer__name", lookup_expr="icontains"
     )
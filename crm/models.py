@@ -6,6 +6,11 @@ class Customer(models.Model):
     phone = models.CharField(max_length=20, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at"], name="customer_created_at_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -15,6 +20,12 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.PositiveIntegerField(default=0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["price"], name="product_price_idx"),
+            models.Index(fields=["stock"], name="product_stock_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -25,5 +36,11 @@ class Order(models.Model):
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     order_date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["total_amount"], name="order_total_amount_idx"),
+            models.Index(fields=["order_date"], name="order_order_date_idx"),
+        ]
+
     def __str__(self):
         return f"Order #{self.id} by {self.customer.name}"
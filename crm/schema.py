@@ -2,187 +2,287 @@ import re
 import graphene
 from graphene_django import DjangoObjectType
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from graphene.utils.str_converters import to_snake_case
 from graphene_django.filter import DjangoFilterConnectionField
+from graphql import FieldNode, FragmentSpreadNode
 
 from crm.models import Product
 from .models import Customer, Order
 from .filters import CustomerFilter, ProductFilter, OrderFilter
 
+_PHONE_RE = re.compile(r"^(\+\d{10,15}|\d{3}-\d{3}-\d{4})$")
+
+
+# ===================== HELPERS =====================
+
+def _selected_fields(selection_set, info):
+    """Yield the field nodes of a selection set, expanding fragments."""
+    if selection_set is None:
+        return
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            yield selection
+        elif isinstance(selection, FragmentSpreadNode):
+            yield from _selected_fields(
+                info.fragments[selection.name.value].selection_set, info
+            )
+        else:
+            yield from _selected_fields(selection.selection_set, info)
+
+
+def _node_fields(info):
+    """Snake-case names of the fields selected under ``edges { node { ... } }``."""
+    names = set()
+    for edges in _selected_fields(info.field_nodes[0].selection_set, info):
+        if edges.name.value != "edges":
+            continue
+        for node in _selected_fields(edges.selection_set, info):
+            if node.name.value != "node":
+                continue
+            for field in _selected_fields(node.selection_set, info):
+                names.add(to_snake_case(field.name.value))
+    return names
+
+
+def _requested_fields(info, model):
+    """Model columns selected under ``edges { node { ... } }`` of a connection.
+
+    The primary key and foreign keys are always kept so that relay IDs,
+    select_related() and prefetch_related() keep working on the result.
+    """
+    columns = {field.name: field for field in model._meta.concrete_fields}
+    requested = {model._meta.pk.name}
+    requested.update(name for name, field in columns.items() if field.is_relation)
+    requested.update(name for name in _node_fields(info) if name in columns)
+    return requested
+
 
 # ===================== TYPES =====================
 
 class CustomerType(DjangoObjectType):
     class Meta:
-            model = Customer
-                    fields = "__all__"
-                            interfaces = (graphene.relay.Node,)
-
-
-                            class CustomerInput(graphene.InputObjectType):
-                                name = graphene.String(required=True)
-                                    email = graphene.String(required=True)
-                                        phone = graphene.String()
-
-
-                                        class ProductType(DjangoObjectType):
-                                            class Meta:
-                                                    model = Product
-                                                            fields = "__all__"
-                                                                    interfaces = (graphene.relay.Node,)
-
-
-                                                                    class OrderType(DjangoObjectType):
-                                                                        class Meta:
-                                                                                model = Order
-                                                                                        fields = "__all__"
-                                                                                                interfaces = (graphene.relay.Node,)
-
-
-                                                                                                # ===================== MUTATIONS =====================
-
-                                                                                                class CreateCustomer(graphene.Mutation):
-                                                                                                    customer = graphene.Field(CustomerType)
-                                                                                                        message = graphene.String()
-
-                                                                                                            class Arguments:
-                                                                                                                    name = graphene.String(required=True)
-                                                                                                                            email = graphene.String(required=True)
-                                                                                                                                    phone = graphene.String()
-
-                                                                                                                                        def mutate(self, info, name, email, phone=None):
-                                                                                                                                                if Customer.objects.filter(email=email).exists():
-                                                                                                                                                            raise ValidationError("Email already exists")
-
-                                                                                                                                                                    if phone and not re.match(r"^(\+\d{10,15}|\d{3}-\d{3}-\d{4})$", phone):
-                                                                                                                                                                                raise ValidationError("Invalid phone format")
-
-                                                                                                                                                                                        customer = Customer(name=name, email=email, phone=phone)
-                                                                                                                                                                                                customer.save()
-
-                                                                                                                                                                                                        return CreateCustomer(customer=customer, message="Customer created")
-
-
-                                                                                                                                                                                                        class BulkCreateCustomers(graphene.Mutation):
-                                                                                                                                                                                                            customers = graphene.List(CustomerType)
-                                                                                                                                                                                                                errors = graphene.List(graphene.String)
-
-                                                                                                                                                                                                                    class Arguments:
-                                                                                                                                                                                                                            input = graphene.List(CustomerInput, required=True)
-
-                                                                                                                                                                                                                                def mutate(self, info, input):
-                                                                                                                                                                                                                                        created = []
-                                                                                                                                                                                                                                                errors = []
-
-                                                                                                                                                                                                                                                        for idx, data in enumerate(input):
-                                                                                                                                                                                                                                                                    try:
-                                                                                                                                                                                                                                                                                    if Customer.objects.filter(email=data.email).exists():
-                                                                                                                                                                                                                                                                                                        raise ValidationError("Email already exists")
+        model = Customer
+        fields = "__all__"
+        interfaces = (graphene.relay.Node,)
 
-                                                                                                                                                                                                                                                                                                                        customer = Customer(
-                                                                                                                                                                                                                                                                                                                                            name=data.name,
-                                                                                                                                                                                                                                                                                                                                                                email=data.email,
-                                                                                                                                                                                                                                                                                                                                                                                    phone=data.phone,
-                                                                                                                                                                                                                                                                                                                                                                                                    )
-                                                                                                                                                                                                                                                                                                                                                                                                                    customer.save()
-                                                                                                                                                                                                                                                                                                                                                                                                                                    created.append(customer)
 
-                                                                                                                                                                                                                                                                                                                                                                                                                                                except Exception as e:
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                errors.append(f"Row {idx + 1}: {str(e)}")
+class CustomerInput(graphene.InputObjectType):
+    name = graphene.String(required=True)
+    email = graphene.String(required=True)
+    phone = graphene.String()
 
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                        return BulkCreateCustomers(customers=created, errors=errors)
 
+class ProductType(DjangoObjectType):
+    class Meta:
+        model = Product
+        fields = "__all__"
+        interfaces = (graphene.relay.Node,)
 
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                        class CreateProduct(graphene.Mutation):
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                            product = graphene.Field(ProductType)
-
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                class Arguments:
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                        name = graphene.String(required=True)
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                price = graphene.Decimal(required=True)
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                        stock = graphene.Int()
-
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                            def mutate(self, info, name, price, stock=0):
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                    if price <= 0:
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                raise ValidationError("Price must be positive")
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                        if stock < 0:
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                    raise ValidationError("Stock cannot be negative")
-
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                            product = Product(name=name, price=price, stock=stock)
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                    product.save()
-
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                            return CreateProduct(product=product)
-
-
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                            class CreateOrder(graphene.Mutation):
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                order = graphene.Field(OrderType)
-
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                    class Arguments:
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                            customer_id = graphene.ID(required=True)
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                    product_ids = graphene.List(graphene.ID, required=True)
-
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                        def mutate(self, info, customer_id, product_ids):
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                customer = Customer.objects.get(pk=customer_id)
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                        products = Product.objects.filter(id__in=product_ids)
-
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                if not products.exists():
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                            raise ValidationError("Invalid product IDs")
-
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                    total = sum(p.price for p in products)
-
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                            order = Order(customer=customer, total_amount=total)
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                    order.save()
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                            order.products.set(products)
-
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                    return CreateOrder(order=order)
-
-
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                    # ===================== NEW (ALX TASK 3) =====================
-
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                    class UpdateLowStockProducts(graphene.Mutation):
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                        message = graphene.String()
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                            products = graphene.List(ProductType)
-
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                def mutate(self, info):
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                        products = Product.objects.filter(stock__lt=10)
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                updated = []
-
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                        for product in products:
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                    product.stock += 10
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                product.save()
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                            updated.append(product)
-
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                    return UpdateLowStockProducts(
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                message="Low stock products updated",
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                            products=updated,
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                    )
 
+class OrderType(DjangoObjectType):
+    class Meta:
+        model = Order
+        fields = "__all__"
+        interfaces = (graphene.relay.Node,)
+
+
+# ===================== MUTATIONS =====================
+
+class CreateCustomer(graphene.Mutation):
+    customer = graphene.Field(CustomerType)
+    message = graphene.String()
+
+    class Arguments:
+        name = graphene.String(required=True)
+        email = graphene.String(required=True)
+        phone = graphene.String()
+
+    def mutate(self, info, name, email, phone=None):
+        if phone and not _PHONE_RE.match(phone):
+            raise ValidationError("Invalid phone format")
+
+        # The unique index on email does the duplicate check in the INSERT.
+        try:
+            with transaction.atomic():
+                customer = Customer.objects.create(
+                    name=name, email=email, phone=phone
+                )
+        except IntegrityError:
+            raise ValidationError("Email already exists")
+
+        return CreateCustomer(customer=customer, message="Customer created")
+
+
+class BulkCreateCustomers(graphene.Mutation):
+    customers = graphene.List(CustomerType)
+    errors = graphene.List(graphene.String)
+
+    class Arguments:
+        input = graphene.List(CustomerInput, required=True)
+
+    def mutate(self, info, input):
+        created = []
+        errors = []
+
+        # One query for every duplicate instead of one per row.
+        seen = set(
+            Customer.objects.filter(
+                email__in=[data.email for data in input]
+            ).values_list("email", flat=True)
+        )
+
+        pending = []
+        for idx, data in enumerate(input):
+            if data.email in seen:
+                errors.append(f"Row {idx + 1}: Email already exists")
+                continue
+            if data.phone and not _PHONE_RE.match(data.phone):
+                errors.append(f"Row {idx + 1}: Invalid phone format")
+                continue
+
+            seen.add(data.email)
+            pending.append((idx, data))
+
+        try:
+            with transaction.atomic():
+                created = Customer.objects.bulk_create(
+                    [
+                        Customer(name=data.name, email=data.email, phone=data.phone)
+                        for _, data in pending
+                    ],
+                    batch_size=500,
+                )
+        except IntegrityError:
+            # An email was taken after the check above: insert row by row so
+            # only the conflicting rows are reported.
+            for idx, data in pending:
+                try:
+                    with transaction.atomic():
+                        created.append(
+                            Customer.objects.create(
+                                name=data.name, email=data.email, phone=data.phone
+                            )
+                        )
+                except IntegrityError:
+                    errors.append(f"Row {idx + 1}: Email already exists")
+
+        return BulkCreateCustomers(customers=created, errors=errors)
+
+
+class CreateProduct(graphene.Mutation):
+    product = graphene.Field(ProductType)
+
+    class Arguments:
+        name = graphene.String(required=True)
+        price = graphene.Decimal(required=True)
+        stock = graphene.Int()
+
+    def mutate(self, info, name, price, stock=0):
+        if price <= 0:
+            raise ValidationError("Price must be positive")
+        if stock < 0:
+            raise ValidationError("Stock cannot be negative")
+
+        product = Product(name=name, price=price, stock=stock)
+        product.save()
+
+        return CreateProduct(product=product)
+
+
+class CreateOrder(graphene.Mutation):
+    order = graphene.Field(OrderType)
+
+    class Arguments:
+        customer_id = graphene.ID(required=True)
+        product_ids = graphene.List(graphene.ID, required=True)
+
+    def mutate(self, info, customer_id, product_ids):
+        with transaction.atomic():
+            if not Customer.objects.filter(pk=customer_id).exists():
+                raise ValidationError("Invalid customer ID")
+
+            stats = Product.objects.filter(id__in=product_ids).aggregate(
+                total=Sum("price"), count=Count("id")
+            )
+            if not product_ids or stats["count"] != len(set(product_ids)):
+                raise ValidationError("Invalid product IDs")
+
+            order = Order.objects.create(
+                customer_id=customer_id, total_amount=stats["total"]
+            )
+            order.products.set(product_ids)
+
+        return CreateOrder(order=order)
+
+
+# ===================== NEW (ALX TASK 3) =====================
+
+class UpdateLowStockProducts(graphene.Mutation):
+    message = graphene.String()
+    products = graphene.List(ProductType)
+
+    def mutate(self, info):
+        with transaction.atomic():
+            ids = list(
+                Product.objects.filter(stock__lt=10).values_list("id", flat=True)
+            )
+            # Restock in a single UPDATE, doing the arithmetic in SQL.
+            Product.objects.filter(id__in=ids).update(stock=F("stock") + 10)
+
+        return UpdateLowStockProducts(
+            message="Low stock products updated",
+            products=Product.objects.filter(id__in=ids),
+        )
+
+
+# ===================== QUERY =====================
+
+class Query(graphene.ObjectType):
+    # ALX heartbeat check
+    hello = graphene.String()
+
+    all_customers = DjangoFilterConnectionField(
+        CustomerType, filterset_class=CustomerFilter, max_limit=100
+    )
+    all_products = DjangoFilterConnectionField(
+        ProductType, filterset_class=ProductFilter, max_limit=100
+    )
+    all_orders = DjangoFilterConnectionField(
+        OrderType, filterset_class=OrderFilter, max_limit=100
+    )
+
+    def resolve_hello(self, info):
+        return "CRM is alive"
 
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                    # ===================== QUERY =====================
+    # Only load the columns the client asked for.
+    def resolve_all_customers(self, info, **kwargs):
+        return Customer.objects.only(*_requested_fields(info, Customer))
 
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                    class Query(graphene.ObjectType):
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                        # ALX heartbeat check
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                            hello = graphene.String()
+    def resolve_all_products(self, info, **kwargs):
+        return Product.objects.only(*_requested_fields(info, Product))
 
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                all_customers = DjangoFilterConnectionField(
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                        CustomerType, filterset_class=CustomerFilter
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                            )
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                all_products = DjangoFilterConnectionField(
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                        ProductType, filterset_class=ProductFilter
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                            )
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                all_orders = DjangoFilterConnectionField(
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                        OrderType, filterset_class=OrderFilter
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                            )
+    def resolve_all_orders(self, info, **kwargs):
+        queryset = Order.objects.only(*_requested_fields(info, Order))
 
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                def resolve_hello(self, info):
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                        return "CRM is alive"
+        # Join or prefetch relations only when they are selected, instead of
+        # querying them once per order.
+        selected = _node_fields(info)
+        if "customer" in selected:
+            queryset = queryset.select_related("customer")
+        if "products" in selected:
+            queryset = queryset.prefetch_related("products")
+        return queryset
 
 
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                        # ===================== ROOT MUTATION =====================
+# ===================== ROOT MUTATION =====================
 
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                        class Mutation(graphene.ObjectType):
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                            create_customer = CreateCustomer.Field()
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                bulk_create_customers = BulkCreateCustomers.Field()
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                    create_product = CreateProduct.Field()
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                        create_order = CreateOrder.Field()
+class Mutation(graphene.ObjectType):
+    create_customer = CreateCustomer.Field()
+    bulk_create_customers = BulkCreateCustomers.Field()
+    create_product = CreateProduct.Field()
+    create_order = CreateOrder.Field()
 
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                            # ALX Task 3
-                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                update_low_stock_products = UpdateLowStockProducts.Field()
\ No newline at end of file
+    # ALX Task 3
+    update_low_stock_products = UpdateLowStockProducts.Field()
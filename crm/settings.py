@@ -89,4 +89,8 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'crm.tasks.generate_crm_report',
         'schedule': crontab(day_of_week='mon', hour=6, minute=0),
     },
+    'order-reminders': {
+        'task': 'crm.tasks.send_order_reminders',
+        'schedule': crontab(hour=8, minute=0),
+    },
 }
@@ -1,28 +1,60 @@
-import requests
-from datetime import datetime
+from datetime import datetime, timedelta
 from celery import shared_task
+from django.db.models import Count, Sum
+from django.utils import timezone
+import httpx
+
+from .models import Customer, Order
+
+# Kept for the lifetime of the worker, so the connection is reused
+# across runs. The query is sent as a plain string without client-side
+# parsing or validation.
+_CLIENT = httpx.Client(
+    base_url="http://localhost:8000",
+    transport=httpx.HTTPTransport(retries=3),
+    timeout=5.0,
+)
+
+_ORDERS_LAST_WEEK = """
+query OrdersLastWeek($since: DateTime!, $after: String) {
+  allOrders(orderDate_Gte: $since, first: 100, after: $after) {
+    edges {
+      node {
+        id
+        customer {
+          email
+        }
+      }
+    }
+    pageInfo {
+      hasNextPage
+      endCursor
+    }
+  }
+}
+"""
+
+
+def _execute(query, variables):
+    response = _CLIENT.post("/graphql", json={"query": query, "variables": variables})
+    response.raise_for_status()
+    payload = response.json()
+    if payload.get("errors"):
+        raise RuntimeError("; ".join(e["message"] for e in payload["errors"]))
+    return payload["data"]
+
 
 @shared_task
 def generate_crm_report():
-    url = "http://localhost:8000/graphql"
-    
-    # GraphQL Query to get CRM stats
-    query = """
-    query {
-        totalCustomers
-        totalOrders
-        totalRevenue
-    }
-    """
-    
     try:
-        response = requests.post(url, json={'query': query})
-        data = response.json().get('data', {})
-        
-        customers = data.get('totalCustomers', 0)
-        orders = data.get('totalOrders', 0)
-        revenue = data.get('totalRevenue', 0)
-        
+        # Read the stats straight from the database rather than
+        # round-tripping through our own GraphQL endpoint.
+        customers = Customer.objects.count()
+        stats = Order.objects.aggregate(orders=Count("id"), revenue=Sum("total_amount"))
+
+        orders = stats["orders"]
+        revenue = stats["revenue"] or 0
+
         # Format: YYYY-MM-DD HH:MM:SS - Report: X customers, Y orders, Z revenue
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         log_entry = f"{timestamp} - Report: {customers} customers, {orders} orders, {revenue} revenue\n"
@@ -34,3 +66,26 @@ def generate_crm_report():
         with open('/tmp/crm_report_log.txt', 'a') as f:
             f.write(f"{datetime.now()} - Error generating report: {str(e)}\n")
 
+
+@shared_task
+def send_order_reminders():
+    variables = {"since": (timezone.now() - timedelta(days=7)).isoformat()}
+    orders = []
+
+    # Pages are capped at 100 orders by the connection's max_limit.
+    while True:
+        page = _execute(_ORDERS_LAST_WEEK, variables)["allOrders"]
+
+        orders.extend(edge["node"] for edge in page["edges"])
+        if not page["pageInfo"]["hasNextPage"]:
+            break
+        variables["after"] = page["pageInfo"]["endCursor"]
+
+    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    lines = [
+        f"{ts} - Order {order['id']} Customer {order['customer']['email']}\n"
+        for order in orders
+    ]
+
+    with open("/tmp/order_reminders_log.txt", "a") as f:
+        f.write("".join(lines))
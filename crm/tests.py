@@ -1,3 +1,360 @@
-from django.test import TestCase
+import atexit
+import logging
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import graphene
+import httpx
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import cron, tasks
+from .models import Customer, Order, Product
+from .schema import Mutation, Query
+
+schema = graphene.Schema(query=Query, mutation=Mutation)
+
+
+def execute(query, **variables):
+    return schema.execute(
+        query,
+        variable_values=variables,
+        context_value=RequestFactory().post("/graphql"),
+    )
+
+
+class AllOrdersQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        products = [
+            Product.objects.create(name=f"Product {i}", price=Decimal("10.00"))
+            for i in range(3)
+        ]
+        for i in range(5):
+            customer = Customer.objects.create(
+                name=f"Customer {i}", email=f"customer{i}@example.com"
+            )
+            order = Order.objects.create(
+                customer=customer, total_amount=Decimal("30.00")
+            )
+            order.products.set(products)
+
+    def test_customer_and_products_do_not_query_per_order(self):
+        query = """
+        {
+          allOrders {
+            edges {
+              node {
+                customer { email }
+                products { edges { node { name } } }
+              }
+            }
+          }
+        }
+        """
+        # COUNT for the connection, the page JOINed with its customers,
+        # and one prefetch for every order's products.
+        with self.assertNumQueries(3):
+            result = execute(query)
+
+        self.assertIsNone(result.errors)
+        edges = result.data["allOrders"]["edges"]
+        self.assertEqual(len(edges), 5)
+        self.assertEqual(len(edges[0]["node"]["products"]["edges"]), 3)
+
+
+class AllCustomersQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        product = Product.objects.create(name="Pen", price=Decimal("1.50"))
+        for i in range(3):
+            customer = Customer.objects.create(
+                name=f"Customer {i}", email=f"customer{i}@example.com"
+            )
+            order = Order.objects.create(
+                customer=customer, total_amount=Decimal("1.50")
+            )
+            order.products.set([product])
+
+    def test_order_set_does_not_prefetch_unselected_products(self):
+        query = """
+        {
+          allCustomers {
+            edges {
+              node {
+                name
+                orderSet { edges { node { totalAmount } } }
+              }
+            }
+          }
+        }
+        """
+        # COUNT and page for the customers, then COUNT and page for each
+        # customer's orders, with no products query.
+        with self.assertNumQueries(2 + 2 * 3):
+            result = execute(query)
+
+        self.assertIsNone(result.errors)
+        edges = result.data["allCustomers"]["edges"]
+        self.assertEqual(len(edges), 3)
+        self.assertEqual(len(edges[0]["node"]["orderSet"]["edges"]), 1)
+
+
+class OrderDateFilterTests(TestCase):
+    def test_reminder_query_excludes_older_orders(self):
+        customer = Customer.objects.create(name="Ann", email="ann@example.com")
+        recent = Order.objects.create(customer=customer, total_amount=Decimal("1.00"))
+        old = Order.objects.create(customer=customer, total_amount=Decimal("2.00"))
+        Order.objects.filter(pk=old.pk).update(
+            order_date=timezone.now() - timedelta(days=30)
+        )
+
+        # Run the Celery task's own query, so renaming the filter breaks here.
+        result = execute(
+            tasks._ORDERS_LAST_WEEK,
+            since=(timezone.now() - timedelta(days=7)).isoformat(),
+        )
+
+        self.assertIsNone(result.errors)
+        page = result.data["allOrders"]
+        self.assertEqual(
+            [edge["node"]["customer"]["email"] for edge in page["edges"]],
+            ["ann@example.com"],
+        )
+        self.assertEqual(
+            page["edges"][0]["node"]["id"],
+            graphene.relay.Node.to_global_id("OrderType", recent.pk),
+        )
+        self.assertFalse(page["pageInfo"]["hasNextPage"])
+
+
+class ConnectionColumnTests(TestCase):
+    def test_only_selected_columns_are_loaded(self):
+        Customer.objects.create(name="Ann", email="ann@example.com", phone="+12345678901")
+
+        query = """
+        fragment contact on CustomerType { email }
+        { allCustomers { edges { node { ...contact } } } }
+        """
+        with CaptureQueriesContext(connection) as ctx:
+            result = execute(query)
+
+        self.assertIsNone(result.errors)
+        self.assertEqual(
+            result.data["allCustomers"]["edges"][0]["node"]["email"],
+            "ann@example.com",
+        )
+        page = ctx.captured_queries[-1]["sql"]
+        self.assertIn('"crm_customer"."email"', page)
+        self.assertNotIn('"crm_customer"."phone"', page)
+        self.assertNotIn('"crm_customer"."name"', page)
+
+
+class CreateCustomerTests(TestCase):
+    mutation = """
+    mutation ($email: String!) {
+      createCustomer(name: "Ann", email: $email) {
+        customer { email }
+      }
+    }
+    """
+
+    def test_duplicate_email_is_a_validation_error(self):
+        Customer.objects.create(name="Existing", email="taken@example.com")
+
+        result = execute(self.mutation, email="taken@example.com")
+
+        self.assertIn("Email already exists", result.errors[0].message)
+        # The failed INSERT is rolled back to its savepoint, so the
+        # surrounding transaction stays usable.
+        self.assertEqual(Customer.objects.count(), 1)
+
+
+class BulkCreateCustomersTests(TestCase):
+    mutation = """
+    mutation ($input: [CustomerInput]!) {
+      bulkCreateCustomers(input: $input) {
+        customers { email }
+        errors
+      }
+    }
+    """
+
+    def test_reports_invalid_rows_and_creates_the_rest(self):
+        Customer.objects.create(name="Existing", email="taken@example.com")
+
+        result = execute(
+            self.mutation,
+            input=[
+                {"name": "Ann", "email": "ann@example.com", "phone": "+12345678901"},
+                {"name": "Bob", "email": "taken@example.com"},
+                {"name": "Cid", "email": "cid@example.com", "phone": "12-34"},
+                {"name": "Ann again", "email": "ann@example.com"},
+                {"name": "Dee", "email": "dee@example.com", "phone": "123-456-7890"},
+            ],
+        )
+
+        self.assertIsNone(result.errors)
+        payload = result.data["bulkCreateCustomers"]
+        self.assertEqual(
+            [c["email"] for c in payload["customers"]],
+            ["ann@example.com", "dee@example.com"],
+        )
+        self.assertEqual(
+            payload["errors"],
+            [
+                "Row 2: Email already exists",
+                "Row 3: Invalid phone format",
+                "Row 4: Email already exists",
+            ],
+        )
+        self.assertEqual(Customer.objects.count(), 3)
+
+
+class CreateOrderTests(TestCase):
+    mutation = """
+    mutation ($customerId: ID!, $productIds: [ID]!) {
+      createOrder(customerId: $customerId, productIds: $productIds) {
+        order { totalAmount }
+      }
+    }
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = Customer.objects.create(name="Ann", email="ann@example.com")
+        cls.pen = Product.objects.create(name="Pen", price=Decimal("1.50"))
+        cls.book = Product.objects.create(name="Book", price=Decimal("12.00"))
+
+    def create_order(self, customer_id, product_ids):
+        return execute(
+            self.mutation,
+            customerId=str(customer_id),
+            productIds=[str(pk) for pk in product_ids],
+        )
+
+    def test_total_is_the_sum_of_product_prices(self):
+        result = self.create_order(self.customer.pk, [self.pen.pk, self.book.pk])
+
+        self.assertIsNone(result.errors)
+        order = Order.objects.get()
+        self.assertEqual(order.total_amount, Decimal("13.50"))
+        self.assertEqual(set(order.products.all()), {self.pen, self.book})
+
+    def test_rejects_order_when_any_product_is_unknown(self):
+        result = self.create_order(self.customer.pk, [self.pen.pk, 999])
+
+        self.assertIn("Invalid product IDs", result.errors[0].message)
+        self.assertFalse(Order.objects.exists())
+
+    def test_rejects_unknown_customer_without_creating_an_order(self):
+        result = self.create_order(999, [self.pen.pk])
+
+        self.assertIn("Invalid customer ID", result.errors[0].message)
+        self.assertFalse(Order.objects.exists())
+
+
+class UpdateLowStockProductsTests(TestCase):
+    def test_restocks_only_products_below_ten(self):
+        empty = Product.objects.create(name="P0", price=Decimal("1.00"), stock=0)
+        low = Product.objects.create(name="P1", price=Decimal("1.00"), stock=5)
+        edge = Product.objects.create(name="P2", price=Decimal("1.00"), stock=10)
+        full = Product.objects.create(name="P3", price=Decimal("1.00"), stock=50)
+
+        result = execute(
+            "mutation { updateLowStockProducts { products { name stock } } }"
+        )
+
+        self.assertIsNone(result.errors)
+        self.assertCountEqual(
+            result.data["updateLowStockProducts"]["products"],
+            [{"name": "P0", "stock": 10}, {"name": "P1", "stock": 15}],
+        )
+        stock = dict(Product.objects.values_list("pk", "stock"))
+        self.assertEqual(
+            stock, {empty.pk: 10, low.pk: 15, edge.pk: 10, full.pk: 50}
+        )
+
+
+class CronLogTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.heartbeat_log = os.path.join(tmp.name, "heartbeat.txt")
+        self.low_stock_log = os.path.join(tmp.name, "low_stock.txt")
+
+        for target, value in [
+            ("crm.cron._HEARTBEAT_LOG", self.heartbeat_log),
+            ("crm.cron._LOW_STOCK_LOG", self.low_stock_log),
+        ]:
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        patcher = mock.patch("crm.cron._CLIENT")
+        self.client = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.stop_listeners)
+
+    def stop_listeners(self):
+        # Drain the queues into the files and forget the handlers, so each
+        # test starts with fresh loggers pointing at its own files.
+        for name, listener in cron._listeners.items():
+            listener.stop()
+            atexit.unregister(listener.stop)
+            for handler in listener.handlers:
+                handler.close()
+            logging.getLogger(name).handlers.clear()
+        cron._listeners.clear()
+
+    def read(self, path):
+        self.stop_listeners()
+        with open(path) as f:
+            return f.read()
+
+    def test_heartbeat_logs_status(self):
+        cron.log_crm_heartbeat()
+        self.client.post.side_effect = httpx.ConnectError("refused")
+        cron.log_crm_heartbeat()
+
+        self.assertRegex(
+            self.read(self.heartbeat_log),
+            r"^\d{2}/\d{2}/\d{4}-\d{2}:\d{2}:\d{2} CRM is alive\n"
+            r"\d{2}/\d{2}/\d{4}-\d{2}:\d{2}:\d{2} CRM unreachable\n$",
+        )
+        self.assertFalse(os.path.exists(self.low_stock_log))
+
+    def test_update_low_stock_logs_one_line_per_product(self):
+        self.client.post.return_value.json.return_value = {
+            "data": {
+                "updateLowStockProducts": {
+                    "products": [
+                        {"name": "Pen", "stock": 12},
+                        {"name": "Book", "stock": 15},
+                    ]
+                }
+            }
+        }
+
+        cron.update_low_stock()
+
+        self.assertRegex(
+            self.read(self.low_stock_log),
+            r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2} - Pen -> 12\n"
+            r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2} - Book -> 15\n$",
+        )
+        self.assertFalse(os.path.exists(self.heartbeat_log))
+
+    def test_update_low_stock_raises_graphql_errors(self):
+        self.client.post.return_value.json.return_value = {
+            "data": None,
+            "errors": [{"message": "Something broke"}],
+        }
+
+        with self.assertRaisesMessage(RuntimeError, "Something broke"):
+            cron.update_low_stock()